@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import socketserver
+from debug_logger import DebugLogger
+from socket_client import HOOK_SOCKET_PATH
+import socket_daemon
+import hook_handlers
+
+logger = DebugLogger('claude_tmux_hookd')
+
+class HookRequestHandler(socketserver.StreamRequestHandler):
+    """Handle one JSON request line from the claude_tmux_hooks.py client"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            logger.error(f"Bad hook request: {e}")
+            return
+
+        logger.debug(f"Hook request: {request.get('argv')}")
+        # Lookups cached for one invocation must not leak into the next request
+        hook_handlers.get_current_tmux_pane.cache_clear()
+        exit_code, output = socket_daemon.run_request(request, hook_handlers.main, logger)
+        socket_daemon.send_reply(self.wfile, {'exit_code': exit_code, 'stdout': output}, logger)
+        # Log handlers buffer until exit; write this request's records out now
+        hook_handlers.logger.flush()
+        logger.flush()
+
+class HookDaemon(socket_daemon.DaemonServer):
+    # Requests are served one at a time, which is what makes swapping
+    # os.environ per request in run_request() safe
+
+    def __init__(self, socket_path):
+        super().__init__(socket_path, HookRequestHandler)
+
+def serve(socket_path=HOOK_SOCKET_PATH):
+    """Serve hook requests until the daemon has been idle for IDLE_TIMEOUT seconds"""
+    socket_daemon.serve(socket_path, HookDaemon, logger, "Hook daemon")
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] != 'serve':
+        print("Usage: claude_tmux_hookd.py [serve]")
+        sys.exit(1)
+    serve()
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,69 @@ import os
 import sys
 import json
 import time
+import functools
 import logging
 from pathlib import Path
+from collections import deque
 from datetime import datetime
+import fastjson
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CONFIG_FILE = SCRIPT_DIR / '.debug_config.json'
+LOG_DIR = SCRIPT_DIR / '.logs'
+
+class BufferedFileHandler(logging.StreamHandler):
+    """
+    Append-mode file handler that buffers records in memory.
+    
+    Records are written with one write() per buffer fill instead of one per
+    line; WARNING and above are flushed immediately, and logging.shutdown()
+    flushes the rest when the process exits.
+    """
+    def __init__(self, filename, buffer_size=64 * 1024):
+        super().__init__(open(filename, 'a', buffering=buffer_size))
+    
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def close(self):
+        self.acquire()
+        try:
+            self.stream.flush()
+            self.stream.close()
+        finally:
+            self.release()
+            super().close()
+
+@functools.lru_cache(maxsize=None)
+def _read_debug_config(config_file):
+    """Read the debug_enabled flag from the config file (parsed once per process)"""
+    try:
+        with open(config_file, 'rb') as f:
+            config = fastjson.loads(f.read())
+            return config.get('debug_enabled', False)
+    except (fastjson.JSONDecodeError, IOError):
+        return False
+
+class _JsonExtras:
+    """Log argument that JSON-encodes keyword extras only when a handler formats the record"""
+    __slots__ = ('extras',)
+    
+    def __init__(self, extras):
+        self.extras = extras
+    
+    def __str__(self):
+        return fastjson.dumps(self.extras)
 
 class DebugLogger:
     def __init__(self, script_name):
-        self.script_dir = Path(__file__).parent
-        self.log_dir = self.script_dir / '.logs'
-        self.log_dir.mkdir(exist_ok=True)
-        
-        # Create log file for this script
-        self.log_file = self.log_dir / f'{script_name}.log'
-        self.main_log_file = self.log_dir / 'tmux_claude.log'
+        self.script_dir = SCRIPT_DIR
+        self.log_dir = LOG_DIR
         
         # Check if debug is enabled
         self.debug_enabled = self._is_debug_enabled()
@@ -31,19 +81,15 @@ class DebugLogger:
             return True
         
         # Check config file
-        config_file = self.script_dir / '.debug_config.json'
-        if config_file.exists():
-            try:
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-                    return config.get('debug_enabled', False)
-            except (json.JSONDecodeError, IOError):
-                pass
-        
-        return False
+        return _read_debug_config(str(CONFIG_FILE))
     
     def _setup_logger(self, script_name):
         """Setup logging configuration"""
+        # Only touch the filesystem once we know logs will be written
+        self.log_dir.mkdir(exist_ok=True)
+        self.log_file = self.log_dir / f'{script_name}.log'
+        self.main_log_file = self.log_dir / 'tmux_claude.log'
+        
         # Create logger
         self.logger = logging.getLogger(f'tmux_claude_{script_name}')
         self.logger.setLevel(logging.DEBUG)
@@ -51,6 +97,7 @@ class DebugLogger:
         # Remove existing handlers
         for handler in self.logger.handlers[:]:
             self.logger.removeHandler(handler)
+            handler.close()
         
         # Create formatter
         formatter = logging.Formatter(
@@ -59,13 +106,13 @@ class DebugLogger:
         )
         
         # File handler for script-specific logs
-        file_handler = logging.FileHandler(self.log_file, mode='a')
+        file_handler = BufferedFileHandler(self.log_file)
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
         self.logger.addHandler(file_handler)
         
         # File handler for main log
-        main_handler = logging.FileHandler(self.main_log_file, mode='a')
+        main_handler = BufferedFileHandler(self.main_log_file)
         main_handler.setLevel(logging.INFO)
         main_handler.setFormatter(formatter)
         self.logger.addHandler(main_handler)
@@ -79,55 +126,78 @@ class DebugLogger:
     
     def debug(self, message, **kwargs):
         """Log debug message"""
-        if self.debug_enabled:
-            extra_info = f" | {json.dumps(kwargs)}" if kwargs else ""
-            self.logger.debug(f"{message}{extra_info}")
+        if not self.debug_enabled:
+            return
+        if kwargs:
+            self.logger.debug('%s | %s', message, _JsonExtras(kwargs))
+        else:
+            self.logger.debug(message)
     
     def info(self, message, **kwargs):
         """Log info message"""
-        if self.debug_enabled:
-            extra_info = f" | {json.dumps(kwargs)}" if kwargs else ""
-            self.logger.info(f"{message}{extra_info}")
+        if not self.debug_enabled:
+            return
+        if kwargs:
+            self.logger.info('%s | %s', message, _JsonExtras(kwargs))
+        else:
+            self.logger.info(message)
     
     def warning(self, message, **kwargs):
         """Log warning message"""
-        if self.debug_enabled:
-            extra_info = f" | {json.dumps(kwargs)}" if kwargs else ""
-            self.logger.warning(f"{message}{extra_info}")
+        if not self.debug_enabled:
+            return
+        if kwargs:
+            self.logger.warning('%s | %s', message, _JsonExtras(kwargs))
+        else:
+            self.logger.warning(message)
     
     def error(self, message, **kwargs):
         """Log error message"""
-        if self.debug_enabled:
-            extra_info = f" | {json.dumps(kwargs)}" if kwargs else ""
-            self.logger.error(f"{message}{extra_info}")
+        if not self.debug_enabled:
+            return
+        if kwargs:
+            self.logger.error('%s | %s', message, _JsonExtras(kwargs))
+        else:
+            self.logger.error(message)
     
     def log_function_call(self, func_name, args=None, kwargs=None):
         """Log function call with arguments"""
-        if self.debug_enabled:
-            args_str = f"args={args}" if args else ""
-            kwargs_str = f"kwargs={kwargs}" if kwargs else ""
-            separator = ", " if args_str and kwargs_str else ""
-            self.debug(f"CALL {func_name}({args_str}{separator}{kwargs_str})")
+        if not self.debug_enabled:
+            return
+        args_str = f"args={args}" if args else ""
+        kwargs_str = f"kwargs={kwargs}" if kwargs else ""
+        separator = ", " if args_str and kwargs_str else ""
+        self.debug(f"CALL {func_name}({args_str}{separator}{kwargs_str})")
     
     def log_tmux_command(self, command, result=None, error=None):
         """Log tmux command execution"""
-        if self.debug_enabled:
-            self.debug(f"TMUX_CMD: {' '.join(command)}")
-            if result:
-                self.debug(f"TMUX_OUT: {result}")
-            if error:
-                self.error(f"TMUX_ERR: {error}")
+        if not self.debug_enabled:
+            return
+        self.debug(f"TMUX_CMD: {' '.join(command)}")
+        if result:
+            self.debug(f"TMUX_OUT: {result}")
+        if error:
+            self.error(f"TMUX_ERR: {error}")
     
     def log_pane_state(self, pane_id, action, state=None):
         """Log pane state changes"""
-        if self.debug_enabled:
-            self.info(f"PANE {pane_id} {action}", state=state)
+        if not self.debug_enabled:
+            return
+        self.info(f"PANE {pane_id} {action}", state=state)
     
     def log_hook_execution(self, hook_type, pane_id, success=True):
         """Log hook execution"""
-        if self.debug_enabled:
-            status = "SUCCESS" if success else "FAILED"
-            self.info(f"HOOK {hook_type} {status}", pane_id=pane_id)
+        if not self.debug_enabled:
+            return
+        status = "SUCCESS" if success else "FAILED"
+        self.info(f"HOOK {hook_type} {status}", pane_id=pane_id)
+    
+    def flush(self):
+        """Write out buffered log records (for long-running processes)"""
+        if not self.debug_enabled:
+            return
+        for handler in self.logger.handlers:
+            handler.flush()
     
     def get_log_stats(self):
         """Get logging statistics"""
@@ -140,7 +210,7 @@ class DebugLogger:
             "total_size": 0
         }
         
-        for log_file in self.log_dir.glob('*.log'):
+        for log_file in _log_entries(self.log_dir):
             try:
                 stat = log_file.stat()
                 stats["log_files"][log_file.name] = {
@@ -153,33 +223,39 @@ class DebugLogger:
         
         return stats
 
+def _log_entries(log_dir):
+    """List the *.log files in log_dir as os.DirEntry objects, whose stat() is cached"""
+    try:
+        with os.scandir(log_dir) as entries:
+            return [entry for entry in entries if entry.name.endswith('.log') and entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+def _write_config(config_file, config):
+    """Replace the config file atomically so hooks never read a partial write"""
+    tmp_file = config_file.with_name(f"{config_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(fastjson.dumpb(config))
+    os.replace(tmp_file, config_file)
+
 def enable_debug():
     """Enable debug logging"""
-    script_dir = Path(__file__).parent
-    config_file = script_dir / '.debug_config.json'
-    
     config = {"debug_enabled": True}
-    with open(config_file, 'w') as f:
-        json.dump(config, f, indent=2)
+    _write_config(CONFIG_FILE, config)
     
-    print(f"Debug logging enabled. Logs will be written to: {script_dir / '.logs'}")
+    print(f"Debug logging enabled. Logs will be written to: {LOG_DIR}")
 
 def disable_debug():
     """Disable debug logging"""
-    script_dir = Path(__file__).parent
-    config_file = script_dir / '.debug_config.json'
-    
-    if config_file.exists():
+    if CONFIG_FILE.exists():
         config = {"debug_enabled": False}
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+        _write_config(CONFIG_FILE, config)
     
     print("Debug logging disabled.")
 
 def view_logs(script_name=None, lines=50):
     """View recent log entries"""
-    script_dir = Path(__file__).parent
-    log_dir = script_dir / '.logs'
+    log_dir = LOG_DIR
     
     if not log_dir.exists():
         print("No logs directory found.")
@@ -192,14 +268,15 @@ def view_logs(script_name=None, lines=50):
             return
         log_files = [log_file]
     else:
-        log_files = sorted(log_dir.glob('*.log'), key=lambda x: x.stat().st_mtime, reverse=True)
+        entries = sorted(_log_entries(log_dir), key=lambda x: x.stat().st_mtime, reverse=True)
+        log_files = [Path(entry.path) for entry in entries]
     
     for log_file in log_files:
         print(f"\n=== {log_file.name} ===")
         try:
             with open(log_file, 'r') as f:
-                log_lines = f.readlines()
-                recent_lines = log_lines[-lines:] if len(log_lines) > lines else log_lines
+                # Keep only the last lines in memory rather than the whole file
+                recent_lines = deque(f, maxlen=lines)
                 for line in recent_lines:
                     print(line.rstrip())
         except IOError as e:
@@ -207,17 +284,16 @@ def view_logs(script_name=None, lines=50):
 
 def clear_logs():
     """Clear all log files"""
-    script_dir = Path(__file__).parent
-    log_dir = script_dir / '.logs'
+    log_dir = LOG_DIR
     
     if not log_dir.exists():
         print("No logs directory found.")
         return
     
     count = 0
-    for log_file in log_dir.glob('*.log'):
+    for log_file in _log_entries(log_dir):
         try:
-            log_file.unlink()
+            os.unlink(log_file.path)
             count += 1
         except OSError:
             pass
@@ -0,0 +1,31 @@
+# JSON helpers that use orjson when it is installed and fall back to the
+# standard library otherwise. Both paths produce compact output and accept
+# bytes, so callers can read and write files in binary mode.
+
+try:
+    import orjson
+
+    loads = orjson.loads
+
+    def dumps(obj):
+        """Serialize obj to a compact JSON string"""
+        return orjson.dumps(obj).decode()
+
+    def dumpb(obj):
+        """Serialize obj to compact JSON bytes"""
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    loads = json.loads
+
+    def dumps(obj):
+        """Serialize obj to a compact JSON string"""
+        return json.dumps(obj, separators=(',', ':'))
+
+    def dumpb(obj):
+        """Serialize obj to compact JSON bytes"""
+        return dumps(obj).encode()
+
+# orjson.JSONDecodeError and json.JSONDecodeError both subclass ValueError
+JSONDecodeError = ValueError
@@ -0,0 +1,452 @@
+import os
+import re
+import sys
+import subprocess
+import time
+import functools
+from debug_logger import DebugLogger
+import tmux_daemon
+import pane_state
+import fastjson
+
+# Initialize debug logger
+logger = DebugLogger('claude_tmux_hooks')
+# Hot paths check this before building log messages, so disabled logging costs nothing
+DEBUG = logger.debug_enabled
+
+# Status emoji prefixes the hooks add to window names
+EMOJI_PREFIX_RE = re.compile('^(?:✅|📢|❓|🔄) ')
+
+def strip_emoji_prefix(name):
+    """Remove a status emoji prefix from a window name, if present"""
+    stripped = EMOJI_PREFIX_RE.sub('', name, count=1)
+    if DEBUG:
+        if stripped != name:
+            logger.debug(f"Removed emoji prefix, original name: {stripped}")
+    return stripped
+
+def run_tmux(args, capture=True):
+    """
+    Run a tmux command and return its output.
+
+    Commands go through the control-mode daemon when it is running, so no tmux
+    process is forked; otherwise tmux is run directly. Pass capture=False for
+    commands whose output is never read so no pipes are set up for them.
+    Raises subprocess.CalledProcessError when the command fails.
+    """
+    reply = tmux_daemon.send_command(args)
+    if reply is not None:
+        success, output = reply
+        if not success:
+            raise subprocess.CalledProcessError(1, ['tmux'] + args, output=output)
+        return output
+    
+    if not capture:
+        subprocess.run(['tmux'] + args, check=True, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return ''
+    result = subprocess.run(['tmux'] + args, stdin=subprocess.DEVNULL,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.rstrip('\n')
+
+@functools.lru_cache(maxsize=1)
+def get_current_tmux_pane():
+    """
+    Get the current tmux pane ID.
+    
+    Cached for the rest of the hook invocation; long-running callers must
+    call get_current_tmux_pane.cache_clear() between invocations.
+    """
+    if DEBUG:
+        logger.log_function_call('get_current_tmux_pane')
+    
+    # tmux exports the pane ID to processes started in a pane. run-shell jobs
+    # inherit the server's global environment instead, where TMUX_PANE may be
+    # stale, so the tmux hooks and bindings pass #{pane_id} explicitly
+    pane_id = os.environ.get('TMUX_PANE')
+    if pane_id:
+        if DEBUG:
+            logger.debug(f"Got pane ID from TMUX_PANE: {pane_id}")
+        return pane_id
+    
+    try:
+        cmd = ['tmux', 'display-message', '-p', '#{pane_id}']
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        pane_id = result.stdout.strip()
+        if DEBUG:
+            logger.log_tmux_command(cmd, pane_id)
+            logger.debug(f"Current pane ID: {pane_id}")
+        return pane_id
+    except subprocess.CalledProcessError as e:
+        logger.log_tmux_command(['tmux', 'display-message', '-p', '#{pane_id}'], error=str(e))
+        logger.error(f"Failed to get current pane ID: {e}")
+        return None
+
+# Separator for multi-field tmux format queries; never appears in names
+FIELD_SEP = '\x1f'
+PANE_INFO_FORMAT = FIELD_SEP.join([
+    '#{pane_id}', '#{session_name}', '#{window_name}', '#{automatic-rename}'
+])
+
+def tmux_query(pane_id, fmt):
+    """Expand a tmux format string for a pane with a single display-message call"""
+    if DEBUG:
+        logger.log_function_call('tmux_query', args=[pane_id, fmt])
+    cmd = ['display-message', '-p', '-t', pane_id, fmt]
+    try:
+        output = run_tmux(cmd)
+        if DEBUG:
+            logger.log_tmux_command(['tmux'] + cmd, output)
+        return output
+    except subprocess.CalledProcessError as e:
+        logger.log_tmux_command(['tmux'] + cmd, error=str(e))
+        logger.error(f"Failed to query tmux for {pane_id}: {e}")
+        return None
+
+def get_pane_info(pane_id):
+    """Get pane ID, session name, window name and automatic-rename status in one tmux call"""
+    if DEBUG:
+        logger.log_function_call('get_pane_info', args=[pane_id])
+    output = tmux_query(pane_id, PANE_INFO_FORMAT)
+    if output is None:
+        return None
+    
+    fields = output.split(FIELD_SEP)
+    if len(fields) != 4:
+        logger.error(f"Unexpected pane info for {pane_id}: {output!r}")
+        return None
+    
+    info = {
+        'pane_id': fields[0],
+        'session_name': fields[1],
+        'window_name': fields[2],
+        # Flag options expand to 1/0 in formats; compare the whole value, never a substring
+        'auto_rename': fields[3] in ('1', 'on')
+    }
+    if DEBUG:
+        logger.debug(f"Pane {pane_id} info: {info}")
+    return info
+
+def set_pane_name(pane_id, name):
+    """Set the window name of a tmux pane and disable automatic rename"""
+    if DEBUG:
+        logger.log_function_call('set_pane_name', args=[pane_id, name])
+    # Chain both commands with tmux's ';' separator so a single client does the work
+    cmd = ['set-option', '-t', pane_id, 'automatic-rename', 'off', ';',
+           'rename-window', '-t', pane_id, name]
+    try:
+        run_tmux(cmd, capture=False)
+        if DEBUG:
+            logger.log_tmux_command(['tmux'] + cmd, "SUCCESS")
+            logger.info(f"Set pane {pane_id} window name to: {name}")
+        return True
+    except subprocess.CalledProcessError as e:
+        logger.log_tmux_command(['tmux'] + cmd, error=str(e))
+        logger.error(f"Failed to set window name for {pane_id}: {e}")
+        return False
+
+def save_pane_state(pane_id, original_name, status, auto_rename_was_on):
+    """Save pane state to the shared state store"""
+    if DEBUG:
+        logger.log_function_call('save_pane_state', args=[pane_id, original_name, status, auto_rename_was_on])
+    
+    state = {
+        'pane_id': pane_id,
+        'original_name': original_name,
+        'status': status,
+        'timestamp': time.time(),
+        'auto_rename_was_on': auto_rename_was_on
+    }
+    try:
+        pane_state.set_state(pane_id, state)
+        if DEBUG:
+            logger.log_pane_state(pane_id, f"SAVED_{status.upper()}", state)
+            logger.info(f"Saved state for pane {pane_id}: {status}")
+    except IOError as e:
+        logger.error(f"Failed to save state for pane {pane_id}: {e}")
+
+def load_pane_state(pane_id):
+    """Load pane state from the shared state store"""
+    if DEBUG:
+        logger.log_function_call('load_pane_state', args=[pane_id])
+    state = pane_state.get_state(pane_id)
+    if DEBUG:
+        if state:
+            logger.log_pane_state(pane_id, "LOADED", state)
+            logger.debug(f"Loaded state for pane {pane_id}: {state}")
+        else:
+            logger.debug(f"No state found for pane {pane_id}")
+    return state
+
+def cleanup_pane_state(pane_id):
+    """Remove pane state from the shared state store"""
+    if DEBUG:
+        logger.log_function_call('cleanup_pane_state', args=[pane_id])
+    try:
+        removed = pane_state.remove_states([pane_id])
+        if DEBUG:
+            if removed:
+                logger.log_pane_state(pane_id, "CLEANED_UP")
+                logger.info(f"Cleaned up state for pane {pane_id}")
+            else:
+                logger.debug(f"No state to cleanup for pane {pane_id}")
+    except OSError as e:
+        logger.error(f"Failed to cleanup state for pane {pane_id}: {e}")
+
+def get_claude_pane_id():
+    """Get the pane ID where Claude is running"""
+    if DEBUG:
+        logger.log_function_call('get_claude_pane_id')
+    
+    # TMUX_PANE, falling back to asking tmux (for manual testing)
+    pane_id = get_current_tmux_pane()
+    if pane_id:
+        return pane_id
+    
+    logger.error("Could not determine Claude pane ID")
+    return None
+
+# Per-hook emoji, saved status and notification text
+HOOKS = {
+    'stop': ('✅', 'stop', 'Claude finished'),
+    'notification': ('📢', 'notification', 'Claude notification'),
+    'pretooluse': ('❓', 'permission', 'Claude needs tool permission')
+}
+
+def apply_emoji_hook(hook_name):
+    """Prefix the Claude pane's window name with the emoji for a hook and save its state"""
+    emoji, status, notify_text = HOOKS[hook_name]
+    hook_label = hook_name.upper()
+    if DEBUG:
+        logger.log_function_call('apply_emoji_hook', args=[hook_name])
+        logger.info(f"Processing Claude {hook_name} hook")
+    
+    pane_id = get_claude_pane_id()
+    if not pane_id:
+        logger.error("Could not get Claude pane ID")
+        logger.log_hook_execution(hook_label, None, success=False)
+        return
+    
+    pane_info = get_pane_info(pane_id)
+    current_name = pane_info['window_name'] if pane_info else None
+    if not current_name:
+        logger.error(f"Could not get current name for pane {pane_id}")
+        logger.log_hook_execution(hook_label, pane_id, success=False)
+        return
+    
+    if DEBUG:
+        logger.debug(f"Current pane name: {current_name}")
+    
+    # Check if we already have a state saved
+    state = load_pane_state(pane_id)
+    if state:
+        original_name = state['original_name']
+        auto_rename_was_on = state.get('auto_rename_was_on', True)
+        if DEBUG:
+            logger.debug(f"Using saved original name: {original_name}")
+    else:
+        auto_rename_was_on = pane_info['auto_rename']
+        # Remove any existing emoji prefix to get original name
+        original_name = strip_emoji_prefix(current_name)
+    
+    new_name = f"{emoji} {original_name}"
+    if DEBUG:
+        logger.debug(f"Setting new name: {new_name}")
+    
+    if set_pane_name(pane_id, new_name):
+        save_pane_state(pane_id, original_name, status, auto_rename_was_on)
+        
+        if DEBUG:
+            # Send notification
+            session_name = pane_info['session_name']
+            notify_message = f"{session_name}:{pane_id} - {notify_text}"
+            logger.debug(f"Sending notification: {notify_message}")
+            
+            logger.log_hook_execution(hook_label, pane_id, success=True)
+            logger.info(f"{hook_name} hook completed successfully for pane {pane_id}")
+    else:
+        logger.error(f"Failed to set pane name for {pane_id}")
+        logger.log_hook_execution(hook_label, pane_id, success=False)
+
+def is_waiting_for_permission(payload_data=None):
+    """
+    Determine if Claude is waiting for user permission by analyzing the hook payload.
+    
+    The raw JSON payload is read from stdin by the claude_tmux_hooks.py client
+    and passed in here, so this also works inside the hook daemon. Without a
+    payload, fall back to assuming permission is needed.
+    """
+    if DEBUG:
+        logger.log_function_call('is_waiting_for_permission')
+    
+    try:
+        if payload_data:
+            try:
+                payload = fastjson.loads(payload_data)
+                # The payload carries the whole tool input (file contents for
+                # Write/Edit), so only format it when it will be logged
+                if DEBUG:
+                    logger.debug(f"Received hook payload: {payload}")
+                
+                # Log the tool being called for debugging
+                tool_name = payload.get('tool_name', 'unknown')
+                if DEBUG:
+                    logger.debug(f"Tool being called: {tool_name}")
+                
+                # For now, we'll use a heuristic approach
+                # Claude typically waits for permission on potentially dangerous tools
+                # or when the user has not granted blanket permission
+                
+                # Check if this is a tool that typically requires permission
+                permission_required_tools = ['Bash', 'Write', 'Edit', 'MultiEdit']
+                if tool_name in permission_required_tools:
+                    if DEBUG:
+                        logger.debug(f"Tool {tool_name} typically requires permission")
+                    return True
+                
+                # Additional heuristics could be added here based on:
+                # - Tool parameters (e.g., dangerous commands in Bash)
+                # - Session state
+                # - User preferences
+                
+                return False
+                
+            except (fastjson.JSONDecodeError, Exception) as e:
+                if DEBUG:
+                    logger.debug(f"Could not parse hook payload: {e}")
+                
+        # Fallback: use environment variables or other indicators
+        # Check if we're in a permission-waiting state by looking for specific env vars
+        # or checking recent tool execution patterns
+        
+        # For now, we'll be conservative and assume permission is needed
+        # This can be refined based on actual usage patterns
+        if DEBUG:
+            logger.debug("No payload available, using fallback heuristics")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error in permission detection: {e}")
+        return False
+
+def handle_pretooluse_hook(payload_data=None):
+    """Handle Claude PreToolUse event - add question mark emoji only when waiting for permission"""
+    if DEBUG:
+        logger.log_function_call('handle_pretooluse_hook')
+    
+    # First, determine if Claude is actually waiting for permission
+    if not is_waiting_for_permission(payload_data):
+        if DEBUG:
+            logger.debug("Claude is not waiting for permission, skipping emoji display")
+            logger.log_hook_execution('PRETOOLUSE', None, success=True)
+        return
+    
+    if DEBUG:
+        logger.info("Claude is waiting for permission, showing question mark emoji")
+    apply_emoji_hook('pretooluse')
+
+def restore_pane_name(pane_id, state=None):
+    """Restore original pane name and auto-rename setting
+    
+    Callers that have already loaded the pane state can pass it in to
+    avoid reading the state file a second time.
+    """
+    if DEBUG:
+        logger.log_function_call('restore_pane_name', args=[pane_id])
+        logger.info(f"Restoring original name for pane {pane_id}")
+    
+    if state is None:
+        state = load_pane_state(pane_id)
+    if state:
+        original_name = state['original_name']
+        auto_rename_was_on = state.get('auto_rename_was_on', True)
+        if DEBUG:
+            logger.debug(f"Restoring to original name: {original_name}, auto-rename: {auto_rename_was_on}")
+        
+        # Restore the window name and auto-rename setting in a single tmux call
+        cmd = ['rename-window', '-t', pane_id, original_name, ';',
+               'set-option', '-t', pane_id, 'automatic-rename', 'on' if auto_rename_was_on else 'off']
+        try:
+            run_tmux(cmd, capture=False)
+            if DEBUG:
+                logger.log_tmux_command(['tmux'] + cmd, "SUCCESS")
+                logger.info(f"Restored pane {pane_id} window name to: {original_name}")
+            
+            cleanup_pane_state(pane_id)
+            if DEBUG:
+                logger.info(f"Successfully restored pane {pane_id} to original state")
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.log_tmux_command(['tmux'] + cmd, error=str(e))
+            logger.error(f"Failed to restore pane {pane_id} name: {e}")
+            return False
+    else:
+        logger.warning(f"No state found for pane {pane_id} to restore")
+        return False
+
+def clear_emoji_on_enter(pane_id=None):
+    """Clear emoji prefix from the pane Enter was pressed in (the current pane by default)"""
+    if DEBUG:
+        logger.log_function_call('clear_emoji_on_enter', args=[pane_id])
+    
+    # The Enter binding passes #{pane_id}; fall back to the current pane
+    if not pane_id:
+        pane_id = get_current_tmux_pane()
+    if not pane_id:
+        logger.debug("Could not get current pane ID for Enter key clear")
+        return
+    
+    # Check if this pane has an emoji prefix (saved state exists)
+    state = load_pane_state(pane_id)
+    if state:
+        if DEBUG:
+            logger.debug(f"Found emoji state for pane {pane_id}, clearing emoji prefix")
+        restore_pane_name(pane_id, state=state)
+    else:
+        if DEBUG:
+            logger.debug(f"No emoji state found for pane {pane_id}, no action needed")
+    
+    # This function is designed to be lightweight and fast
+    # to avoid introducing input lag when Enter is pressed
+
+def main(argv=None, payload_data=None):
+    """
+    Dispatch a hook action.
+    
+    argv holds the arguments after the script name (defaults to sys.argv[1:]);
+    payload_data is the raw hook payload Claude piped to the client's stdin.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 1:
+        print("Usage: claude_tmux_hooks.py [stop|notification|pretooluse|restore|clear_emoji_on_enter] [pane_id]")
+        sys.exit(1)
+    
+    action = args[0]
+    if DEBUG:
+        logger.info(f"Starting claude_tmux_hooks with action: {action}")
+        logger.debug(f"Command line args: {args}")
+    
+    try:
+        if action == 'pretooluse':
+            handle_pretooluse_hook(payload_data)
+        elif action in HOOKS:
+            apply_emoji_hook(action)
+        elif action == 'restore':
+            if len(args) >= 2:
+                pane_id = args[1]
+                restore_pane_name(pane_id)
+            else:
+                pane_id = get_claude_pane_id()
+                if pane_id:
+                    restore_pane_name(pane_id)
+                else:
+                    logger.error("Could not get Claude pane ID for restore")
+        elif action == 'clear_emoji_on_enter':
+            clear_emoji_on_enter(args[1] if len(args) >= 2 else None)
+        else:
+            logger.error(f"Unknown action: {action}")
+            print(f"Unknown action: {action}")
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Unexpected error in main: {e}")
+        raise
@@ -2,191 +2,294 @@
 
 import os
 import sys
+import shutil
 import subprocess
+import threading
+import socketserver
 import json
 import time
 from pathlib import Path
-from tmux_integration import TmuxIntegration
+from tmux_integration import TmuxIntegration, run_process
+import tmux_integration
+from debug_logger import DebugLogger
+import socket_daemon
+from socket_client import NOTIFY_SOCKET_PATH
+
+# Notification commands, in order of preference
+NOTIFIERS = ('notify_windows', 'notify-send', 'osascript', 'powershell')
+URGENCIES = {'high': 'critical', 'low': 'low'}
+PRIORITIES = ('low', 'normal', 'high')
+# Event type -> action in the message; other events use the event type itself
+EVENTS = {
+    'stop': 'finished',
+    'notification': 'sent notification'
+}
+# The daemon sends notifications queued within this many seconds of each other as one
+BATCH_DELAY = 0.1
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+def find_notifier():
+    """Return the name and path of the first installed notifier, or (None, None)"""
+    for name in NOTIFIERS:
+        path = shutil.which(name)
+        if path:
+            return name, path
+    return None, None
+
+# Looked up once per interpreter so each notification is a single spawn
+NOTIFIER, NOTIFIER_PATH = find_notifier()
+
+logger = DebugLogger('notification_handler')
 
 class NotificationHandler:
-    def __init__(self):
+    def __init__(self, batch=False):
         self.tmux = TmuxIntegration()
-        self.script_dir = Path(__file__).parent
+        self.script_dir = SCRIPT_DIR
+        self.notifier, self.notifier_path = NOTIFIER, NOTIFIER_PATH
+        self._notify = getattr(self, f"_notify_via_{self.notifier.replace('-', '_')}") if self.notifier else None
+        # The daemon swaps TMUX/TMUX_PANE in os.environ per request, and a batch
+        # may be flushed during another request, so notifiers get this snapshot
+        self.env = dict(os.environ)
+        self.batch = batch
+        self._pending = []
+        self._flush_timer = None
+        self._pending_lock = threading.Lock()
+    
+    def _run_notifier(self, args, quiet=False):
+        """
+        Run the notifier and wait for it to exit.
+        
+        Uses posix_spawn rather than subprocess so the spawn cost does not grow
+        with this process's memory. posix_spawn needs Python 3.8, so older
+        interpreters fall back to subprocess.
+        """
+        if not hasattr(os, 'posix_spawn'):
+            output = subprocess.DEVNULL if quiet else None
+            subprocess.run([self.notifier_path] + args, stdout=output, stderr=output, env=self.env)
+            return
         
+        file_actions = []
+        if quiet:
+            file_actions = [(os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_WRONLY, 0) for fd in (1, 2)]
+        pid = os.posix_spawn(self.notifier_path, [self.notifier] + args, self.env,
+                             file_actions=file_actions)
+        os.waitpid(pid, 0)
+    
     def send_notification(self, message, priority='normal'):
-        """Send a notification using notify_windows command"""
+        """Send a notification with the notifier found at startup"""
+        if self._notify is None:
+            return False
         try:
-            # Use the notify_windows command as specified in CLAUDE.md
-            subprocess.run(['notify_windows', message], check=False)
+            self._notify(message, priority)
             return True
-        except FileNotFoundError:
-            # Fallback to system notifications if notify_windows is not available
-            return self._send_system_notification(message, priority)
-        except Exception:
+        except OSError:
             return False
     
-    def _send_system_notification(self, message, priority='normal'):
-        """Fallback to system notification methods"""
-        # Try notify-send (Linux)
-        try:
-            urgency = 'normal'
-            if priority == 'high':
-                urgency = 'critical'
-            elif priority == 'low':
-                urgency = 'low'
-            
-            subprocess.run(['notify-send', '-u', urgency, 'Claude Tmux', message], 
-                          check=False, capture_output=True)
-            return True
-        except FileNotFoundError:
-            pass
+    def queue_notification(self, message, priority='normal'):
+        """
+        Queue a notification to be sent with any others arriving within BATCH_DELAY.
         
-        # Try osascript (macOS)
-        try:
-            script = f'display notification "{message}" with title "Claude Tmux"'
-            subprocess.run(['osascript', '-e', script], 
-                          check=False, capture_output=True)
-            return True
-        except FileNotFoundError:
-            pass
+        Without batching the notification is sent straight away; a one-shot
+        CLI run exits before anything else could join the batch.
+        """
+        if not self.batch:
+            return self.send_notification(message, priority)
+        if self._notify is None:
+            return False
         
-        # Try Windows toast notifications
-        try:
-            # Simple Windows notification using powershell
-            ps_script = f'''
-            [Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null
-            $template = [Windows.UI.Notifications.ToastTemplateType]::ToastText01
-            $toastXml = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent($template)
-            $toastXml.SelectSingleNode("//text[@id='1']").AppendChild($toastXml.CreateTextNode("{message}")) | Out-Null
-            $toast = [Windows.UI.Notifications.ToastNotification]::new($toastXml)
-            [Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Claude Tmux").Show($toast)
-            '''
-            subprocess.run(['powershell', '-Command', ps_script], 
-                          check=False, capture_output=True)
-            return True
-        except FileNotFoundError:
-            pass
+        with self._pending_lock:
+            self._pending.append((message, priority))
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(BATCH_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return True
+    
+    def flush(self):
+        """Send all queued notifications now as a single notification"""
+        with self._pending_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            pending, self._pending = self._pending, []
         
-        return False
+        if not pending:
+            return True
+        if len(pending) == 1:
+            message, priority = pending[0]
+        else:
+            message = f"{len(pending)} Claude events: " + '; '.join(message for message, _ in pending)
+            priority = max((priority for _, priority in pending), key=PRIORITIES.index)
+        return self.send_notification(message, priority)
+    
+    def _notify_via_notify_windows(self, message, priority):
+        """Use the notify_windows command as specified in CLAUDE.md"""
+        self._run_notifier([message])
+    
+    def _notify_via_notify_send(self, message, priority):
+        """Linux desktop notification"""
+        urgency = URGENCIES.get(priority, 'normal')
+        self._run_notifier(['-u', urgency, 'Claude Tmux', message], quiet=True)
+    
+    def _notify_via_osascript(self, message, priority):
+        """macOS notification"""
+        script = f'display notification "{message}" with title "Claude Tmux"'
+        self._run_notifier(['-e', script], quiet=True)
+    
+    def _notify_via_powershell(self, message, priority):
+        """Windows toast notification (e.g. from WSL)"""
+        ps_script = f'''
+        [Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] | Out-Null
+        $template = [Windows.UI.Notifications.ToastTemplateType]::ToastText01
+        $toastXml = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent($template)
+        $toastXml.SelectSingleNode("//text[@id='1']").AppendChild($toastXml.CreateTextNode("{message}")) | Out-Null
+        $toast = [Windows.UI.Notifications.ToastNotification]::new($toastXml)
+        [Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("Claude Tmux").Show($toast)
+        '''
+        self._run_notifier(['-Command', ps_script], quiet=True)
     
     def format_pane_notification(self, pane_id, event_type, session_name=None):
         """Format a notification message for a pane event"""
         if not session_name:
-            session_name = self.tmux.get_current_session() or 'unknown'
+            pane_info = self.tmux.get_pane_and_session(pane_id)
+            session_name = pane_info['session'] if pane_info else 'unknown'
         
-        pane_info = self.tmux.get_pane_info(pane_id)
-        pane_title = pane_info['title'] if pane_info else 'unknown'
-        
-        # Remove emoji prefixes from title for cleaner notification
-        clean_title = pane_title
-        for emoji in ['✅', '📢', '🔄']:
-            if clean_title.startswith(emoji + ' '):
-                clean_title = clean_title[len(emoji + ' '):]
-                break
-        
-        if event_type == 'stop':
-            emoji = '✅'
-            action = 'finished'
-        elif event_type == 'notification':
-            emoji = '📢'
-            action = 'sent notification'
-        else:
-            emoji = '🔄'
-            action = event_type
+        action = EVENTS.get(event_type, event_type)
         
         # Format as specified in CLAUDE.md: prepend with pane name
         message = f"{session_name}:{pane_id} - Claude {action}"
         return message
     
     def notify_claude_stop(self, pane_id=None, session_name=None):
-        """Send notification when Claude stops"""
+        """Queue a notification for when Claude stops"""
         if not pane_id:
             pane_id = self.tmux.get_current_pane()
         
         if pane_id:
             message = self.format_pane_notification(pane_id, 'stop', session_name)
-            return self.send_notification(message)
+            return self.queue_notification(message)
         return False
     
     def notify_claude_notification(self, pane_id=None, session_name=None):
-        """Send notification when Claude sends a notification"""
+        """Queue a notification for when Claude sends a notification"""
         if not pane_id:
             pane_id = self.tmux.get_current_pane()
         
         if pane_id:
             message = self.format_pane_notification(pane_id, 'notification', session_name)
-            return self.send_notification(message, priority='high')
+            return self.queue_notification(message, priority='high')
         return False
     
     def notify_custom(self, message, pane_id=None, session_name=None):
-        """Send a custom notification with pane prefix"""
+        """Queue a custom notification with pane prefix"""
         if not pane_id:
             pane_id = self.tmux.get_current_pane()
         
-        if not session_name:
-            session_name = self.tmux.get_current_session() or 'unknown'
-        
         if pane_id:
+            if not session_name:
+                pane_info = self.tmux.get_pane_and_session(pane_id)
+                session_name = pane_info['session'] if pane_info else 'unknown'
             formatted_message = f"{session_name}:{pane_id} - {message}"
-            return self.send_notification(formatted_message)
+            return self.queue_notification(formatted_message)
         else:
-            return self.send_notification(message)
+            return self.queue_notification(message)
     
-    def test_notification_system(self):
-        """Test the notification system"""
-        methods = []
-        
-        # Test notify_windows
-        try:
-            result = subprocess.run(['notify_windows', 'Test notification'], 
-                                  check=False, capture_output=True)
-            methods.append(f"notify_windows: {'✅' if result.returncode == 0 else '❌'}")
-        except FileNotFoundError:
-            methods.append("notify_windows: ❌ (not found)")
-        
-        # Test notify-send
+    async def _probe_notifier(self, name, cmd):
+        """Run one notifier test command and describe the result"""
         try:
-            result = subprocess.run(['notify-send', 'Test', 'Test notification'], 
-                                  check=False, capture_output=True)
-            methods.append(f"notify-send: {'✅' if result.returncode == 0 else '❌'}")
+            returncode, _ = await run_process(*cmd)
+            return f"{name}: {'✅' if returncode == 0 else '❌'}"
         except FileNotFoundError:
-            methods.append("notify-send: ❌ (not found)")
-        
-        # Test osascript
+            return f"{name}: ❌ (not found)"
+    
+    async def test_notification_system(self):
+        """Test the notification system"""
+        # The probes are independent, so run them concurrently
+        import asyncio
+        methods = await asyncio.gather(
+            self._probe_notifier('notify_windows', ['notify_windows', 'Test notification']),
+            self._probe_notifier('notify-send', ['notify-send', 'Test', 'Test notification']),
+            self._probe_notifier('osascript', ['osascript', '-e', 'display notification "Test" with title "Test"'])
+        )
+        return list(methods)
+
+class NotificationRequestHandler(socketserver.StreamRequestHandler):
+    """Run one JSON request line from notify_client.py with the daemon's handler"""
+    
+    def handle(self):
         try:
-            result = subprocess.run(['osascript', '-e', 'display notification "Test" with title "Test"'], 
-                                  check=False, capture_output=True)
-            methods.append(f"osascript: {'✅' if result.returncode == 0 else '❌'}")
-        except FileNotFoundError:
-            methods.append("osascript: ❌ (not found)")
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            logger.error(f"Bad notification request: {e}")
+            return
         
-        return methods
+        if request.get('argv', [])[:1] == ['daemon']:
+            exit_code, output = 1, "Notification daemon already running\n"
+        else:
+            # Drop cached tmux lookups; they may belong to another client's pane
+            self.server.handler.tmux.invalidate()
+            exit_code, output = socket_daemon.run_request(
+                request, lambda argv, payload: main(argv, self.server.handler), logger)
+        socket_daemon.send_reply(self.wfile, {'exit_code': exit_code, 'stdout': output}, logger)
+        # Log handlers buffer until exit; write this request's records out now
+        tmux_integration.logger.flush()
+        logger.flush()
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: notification_handler.py [stop|notification|custom|test] [args...]")
+class NotificationDaemon(socket_daemon.DaemonServer):
+    # Requests are served one at a time, which keeps the per-request
+    # environment swap in run_request() safe
+    
+    def __init__(self, socket_path):
+        # Batched: requests are answered once queued, and a timer thread
+        # sends the notifications
+        self.handler = NotificationHandler(batch=True)
+        super().__init__(socket_path, NotificationRequestHandler)
+    
+    def server_close(self):
+        super().server_close()
+        self.handler.flush()
+
+def serve():
+    """Serve notify_client.py requests until idle for IDLE_TIMEOUT seconds"""
+    socket_daemon.serve(NOTIFY_SOCKET_PATH, NotificationDaemon, logger, "Notification daemon")
+
+def main(argv=None, handler=None):
+    """
+    Run one notification command.
+    
+    argv holds the arguments after the script name (defaults to sys.argv[1:]);
+    the daemon passes its long-lived handler so tmux lookups stay warm.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 1:
+        print("Usage: notification_handler.py [stop|notification|custom|test|daemon] [args...]")
         sys.exit(1)
     
-    handler = NotificationHandler()
-    command = sys.argv[1]
+    command = args[0]
+    if command == 'daemon':
+        serve()
+        return
+    
+    handler = handler or NotificationHandler()
     
     if command == 'stop':
-        pane_id = sys.argv[2] if len(sys.argv) >= 3 else None
-        session_name = sys.argv[3] if len(sys.argv) >= 4 else None
+        pane_id = args[1] if len(args) >= 2 else None
+        session_name = args[2] if len(args) >= 3 else None
         success = handler.notify_claude_stop(pane_id, session_name)
         print("OK" if success else "FAILED")
     
     elif command == 'notification':
-        pane_id = sys.argv[2] if len(sys.argv) >= 3 else None
-        session_name = sys.argv[3] if len(sys.argv) >= 4 else None
+        pane_id = args[1] if len(args) >= 2 else None
+        session_name = args[2] if len(args) >= 3 else None
         success = handler.notify_claude_notification(pane_id, session_name)
         print("OK" if success else "FAILED")
     
     elif command == 'custom':
-        if len(sys.argv) >= 3:
-            message = sys.argv[2]
-            pane_id = sys.argv[3] if len(sys.argv) >= 4 else None
-            session_name = sys.argv[4] if len(sys.argv) >= 5 else None
+        if len(args) >= 2:
+            message = args[1]
+            pane_id = args[2] if len(args) >= 3 else None
+            session_name = args[3] if len(args) >= 4 else None
             success = handler.notify_custom(message, pane_id, session_name)
             print("OK" if success else "FAILED")
         else:
@@ -195,7 +298,8 @@ def main():
     
     elif command == 'test':
         print("Testing notification methods:")
-        methods = handler.test_notification_system()
+        import asyncio
+        methods = asyncio.run(handler.test_notification_system())
         for method in methods:
             print(f"  {method}")
         
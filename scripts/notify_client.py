@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+# Thin client for notification_handler.py: takes the same arguments and
+# forwards them to the resident notification daemon, so each notification
+# skips interpreter warm-up and the handler imports. Keep imports here to
+# the bare minimum.
+
+import os
+import sys
+from socket_client import NOTIFY_SOCKET_PATH, FORWARDED_ENV, forward, spawn_daemon
+
+# The daemon replies once a notification is queued, but `test` waits for the notifier probes
+REPLY_TIMEOUT = 10.0
+
+def main():
+    argv = sys.argv[1:]
+    request = {
+        'argv': argv,
+        'env': {key: os.environ[key] for key in FORWARDED_ENV if key in os.environ}
+    }
+
+    reply = forward(request, NOTIFY_SOCKET_PATH, REPLY_TIMEOUT)
+    if reply is None:
+        # No daemon yet: start one for the next call and handle this one in-process
+        spawn_daemon('notification_handler.py', 'daemon')
+        from notification_handler import main as run_command
+        run_command(argv)
+        return
+
+    sys.stdout.write(reply.get('stdout', ''))
+    sys.exit(reply.get('exit_code', 1))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import time
+import sqlite3
+import threading
+import contextlib
+from pathlib import Path
+import fastjson
+
+# All pane states live in one SQLite table keyed by pane ID
+SCRIPT_DIR = Path(__file__).resolve().parent
+STATE_DB = SCRIPT_DIR / '.pane_states.db'
+# Per-pane state files written by earlier versions, imported when the database is created
+LEGACY_STATE_GLOB = '.pane_state_*.json'
+
+class StateStoreError(OSError):
+    """Raised when the state database cannot be read or written"""
+
+_local = threading.local()
+
+def _connection():
+    """Return this thread's connection to the state database, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        is_new = not STATE_DB.exists()
+        conn = sqlite3.connect(str(STATE_DB), timeout=5, isolation_level=None)
+        # WAL lets hook processes write while others read; NORMAL skips an fsync per commit
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS pane_state ('
+                     'pane_id TEXT PRIMARY KEY, status TEXT, mtime REAL, payload TEXT)')
+        _local.conn = conn
+        if is_new:
+            import_legacy_states()
+    return conn
+
+@contextlib.contextmanager
+def _transaction():
+    """
+    Run statements in one write transaction.
+
+    The write lock is taken up front so a select-then-delete cannot race
+    another process. Database failures are raised as StateStoreError.
+    """
+    try:
+        conn = _connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    except sqlite3.Error as e:
+        raise StateStoreError(str(e)) from e
+
+def get_state(pane_id):
+    """Return the saved state for a pane, or None"""
+    try:
+        row = _connection().execute('SELECT payload FROM pane_state WHERE pane_id = ?',
+                                    (pane_id,)).fetchone()
+    except sqlite3.Error:
+        return None
+    return fastjson.loads(row[0]) if row else None
+
+def set_state(pane_id, state):
+    """Save the state for a pane"""
+    with _transaction() as conn:
+        conn.execute('INSERT OR REPLACE INTO pane_state (pane_id, status, mtime, payload) '
+                     'VALUES (?, ?, ?, ?)',
+                     (pane_id, state.get('status'), state.get('timestamp', time.time()),
+                      fastjson.dumps(state)))
+
+def import_legacy_states():
+    """
+    Move states from earlier versions' .pane_state_*.json files into the
+    database and delete the files. A pane that already has a state in the
+    database keeps it. Returns the IDs of the imported panes.
+    """
+    imported = []
+    for path in SCRIPT_DIR.glob(LEGACY_STATE_GLOB):
+        try:
+            with open(path, 'rb') as f:
+                state = fastjson.loads(f.read())
+        except (fastjson.JSONDecodeError, OSError):
+            state = None
+
+        if isinstance(state, dict) and state.get('pane_id'):
+            with _transaction() as conn:
+                if conn.execute('INSERT OR IGNORE INTO pane_state (pane_id, status, mtime, payload) '
+                                'VALUES (?, ?, ?, ?)',
+                                (state['pane_id'], state.get('status'),
+                                 state.get('timestamp', time.time()), fastjson.dumps(state))).rowcount:
+                    imported.append(state['pane_id'])
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+    return imported
+
+def remove_states(pane_ids):
+    """Remove the states for the given panes and return the IDs that had one"""
+    with _transaction() as conn:
+        removed = [pane_id for pane_id in pane_ids
+                   if conn.execute('DELETE FROM pane_state WHERE pane_id = ?', (pane_id,)).rowcount]
+    return removed
+
+def remove_states_except(live_pane_ids):
+    """Remove the states for every pane not in live_pane_ids and return their IDs"""
+    with _transaction() as conn:
+        removed = [row[0] for row in conn.execute('SELECT pane_id FROM pane_state')
+                   if row[0] not in live_pane_ids]
+        conn.executemany('DELETE FROM pane_state WHERE pane_id = ?', [(pane_id,) for pane_id in removed])
+    return removed
+
+def remove_expired_states(max_age):
+    """Remove states saved more than max_age seconds ago and return their IDs"""
+    cutoff = time.time() - max_age
+    with _transaction() as conn:
+        removed = [row[0] for row in
+                   conn.execute('SELECT pane_id FROM pane_state WHERE mtime < ?', (cutoff,))]
+        conn.execute('DELETE FROM pane_state WHERE mtime < ?', (cutoff,))
+    return removed
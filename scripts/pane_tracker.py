@@ -4,35 +4,66 @@ import os
 import sys
 import time
 import json
-import threading
+import atexit
 import signal
+# asyncio is imported only by the monitor; per-event commands never need it
 from pathlib import Path
+import fastjson
 from tmux_integration import TmuxIntegration
-from claude_tmux_hooks import restore_pane_name, load_pane_state
+import pane_state
+from hook_handlers import restore_pane_name, load_pane_state
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+TRACKER_FILE = SCRIPT_DIR / '.pane_tracker.json'
+EVENT_FIFO = SCRIPT_DIR / '.pane_tracker.fifo'
+# Periodic cleanup interval; pane events wake the monitor in between
+CLEANUP_INTERVAL = 30
 
 class PaneTracker:
     def __init__(self):
         self.tmux = TmuxIntegration()
-        self.script_dir = Path(__file__).parent
-        self.tracker_file = self.script_dir / '.pane_tracker.json'
-        self.running = False
-        self.monitor_thread = None
+        self.script_dir = SCRIPT_DIR
+        self.tracker_file = TRACKER_FILE
+        self.monitor_task = None
+        self.event_fifo = EVENT_FIFO
+        self.event_handlers = {
+            'select': self.monitor_pane_activity,
+            'exit': self.handle_pane_exit
+        }
+        # Tracked panes are read on first use and written back once, on flush()
+        self._tracked = None
+        self._dirty = False
+        atexit.register(self.flush)
         
     def load_tracked_panes(self):
-        """Load the list of tracked panes from file"""
-        if self.tracker_file.exists():
-            try:
-                with open(self.tracker_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return {}
-        return {}
+        """Load the list of tracked panes, reading the file only on first use"""
+        if self._tracked is None:
+            self._tracked = self._read_tracker_file()
+        return self._tracked
+    
+    def _read_tracker_file(self):
+        """Read the tracked panes from file; a missing file reads as empty"""
+        try:
+            with open(self.tracker_file, 'rb') as f:
+                return fastjson.loads(f.read())
+        except (fastjson.JSONDecodeError, IOError):
+            return {}
     
     def save_tracked_panes(self, tracked_panes):
-        """Save the list of tracked panes to file"""
+        """Save the list of tracked panes on the next flush"""
+        self._tracked = tracked_panes
+        self._dirty = True
+    
+    def flush(self):
+        """Write the tracked panes to file if they changed"""
+        if not self._dirty:
+            return
+        tmp_file = self.tracker_file.with_name(f"{self.tracker_file.name}.{os.getpid()}.tmp")
         try:
-            with open(self.tracker_file, 'w') as f:
-                json.dump(tracked_panes, f, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(fastjson.dumpb(self._tracked))
+            os.replace(tmp_file, self.tracker_file)
+            self._dirty = False
         except IOError:
             pass
     
@@ -69,36 +100,109 @@ class PaneTracker:
         state = load_pane_state(pane_id)
         if state:
             # Restore the original name when user becomes active
-            restore_pane_name(pane_id)
+            restore_pane_name(pane_id, state=state)
+    
+    def send_event(self, action, pane_id):
+        """
+        Hand a pane event to the running monitor through its FIFO.
+        
+        Returns False when no monitor is listening, so the caller can handle
+        the event itself.
+        """
+        try:
+            fd = os.open(self.event_fifo, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            # ENOENT: no FIFO yet; ENXIO: no monitor has it open for reading
+            return False
+        try:
+            # Lines shorter than PIPE_BUF are written atomically
+            os.write(fd, f"{action} {pane_id}\n".encode())
+            return True
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+    
+    def _open_event_fifo(self):
+        """Create the event FIFO if needed and open both ends without blocking"""
+        try:
+            os.mkfifo(self.event_fifo, 0o600)
+        except FileExistsError:
+            pass
+        read_fd = os.open(self.event_fifo, os.O_RDONLY | os.O_NONBLOCK)
+        # Holding a write end stops the FIFO reading as end-of-file (and so
+        # always readable) each time a sender closes it
+        write_fd = os.open(self.event_fifo, os.O_WRONLY | os.O_NONBLOCK)
+        return read_fd, write_fd
     
     def start_monitoring(self):
-        """Start the background monitoring thread"""
-        if self.running:
+        """Start the monitoring task on the running event loop"""
+        if self.monitor_task and not self.monitor_task.done():
             return
-        
-        self.running = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
+        import asyncio
+        self.monitor_task = asyncio.ensure_future(self._monitor_loop())
     
     def stop_monitoring(self):
-        """Stop the background monitoring"""
-        self.running = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=5)
-    
-    def _monitor_loop(self):
-        """Background monitoring loop"""
-        while self.running:
-            try:
-                # Clean up dead panes
-                self.cleanup_dead_panes()
-                
-                # Check for inactive panes and clean up old states
-                self.cleanup_old_states()
-                
-                time.sleep(30)  # Check every 30 seconds
-            except Exception:
-                pass
+        """Stop the monitoring task"""
+        if self.monitor_task:
+            self.monitor_task.cancel()
+    
+    def _handle_events(self, read_fd, pending):
+        """Dispatch the complete 'action pane_id' lines in the FIFO and return any partial line"""
+        try:
+            pending += os.read(read_fd, 4096)
+        except BlockingIOError:
+            return pending
+        
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            action, _, pane_id = line.decode(errors='replace').partition(' ')
+            handler = self.event_handlers.get(action)
+            if handler and pane_id:
+                handler(pane_id)
+        return pending
+    
+    async def _monitor_loop(self):
+        """Monitoring task: handle pane events as they arrive and clean up periodically"""
+        import asyncio
+        loop = asyncio.get_event_loop()
+        read_fd, write_fd = self._open_event_fifo()
+        readable = asyncio.Event()
+        loop.add_reader(read_fd, readable.set)
+        pending = b''
+        next_cleanup = 0
+        
+        try:
+            while True:
+                try:
+                    if loop.time() >= next_cleanup:
+                        next_cleanup = loop.time() + CLEANUP_INTERVAL
+                        
+                        # Clean up dead panes
+                        self.cleanup_dead_panes()
+                        
+                        # Check for inactive panes and clean up old states
+                        self.cleanup_old_states()
+                    
+                    # Write out changes now and pick up other processes' on the next wake-up
+                    self.flush()
+                    self._tracked = None
+                    
+                    # Sleep until the next cleanup unless a pane event arrives first
+                    try:
+                        await asyncio.wait_for(readable.wait(), max(0, next_cleanup - loop.time()))
+                    except asyncio.TimeoutError:
+                        continue
+                    readable.clear()
+                    pending = self._handle_events(read_fd, pending)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    pass
+        finally:
+            loop.remove_reader(read_fd)
+            os.close(read_fd)
+            os.close(write_fd)
     
     def cleanup_dead_panes(self):
         """Remove tracking for panes that no longer exist"""
@@ -106,46 +210,36 @@ class PaneTracker:
         current_panes = {pane['pane_id'] for pane in self.tmux.get_all_panes()}
         
         # Remove dead panes
-        dead_panes = []
-        for pane_id in tracked_panes:
-            if pane_id not in current_panes:
-                dead_panes.append(pane_id)
-        
+        dead_panes = tracked_panes.keys() - current_panes
         if dead_panes:
             for pane_id in dead_panes:
                 del tracked_panes[pane_id]
-                # Also clean up state files
-                try:
-                    state_file = self.script_dir / f".pane_state_{pane_id.replace('%', '')}.json"
-                    if state_file.exists():
-                        state_file.unlink()
-                except Exception:
-                    pass
+            
+            # Also clean up saved pane states
+            try:
+                pane_state.remove_states(dead_panes)
+            except OSError:
+                pass
             
             self.save_tracked_panes(tracked_panes)
     
     def cleanup_old_states(self):
-        """Clean up state files for panes that haven't been active recently"""
-        current_time = time.time()
+        """Clean up saved states for panes that haven't been active recently"""
         max_age = 3600  # 1 hour
         
-        for state_file in self.script_dir.glob('.pane_state_*.json'):
-            try:
-                if current_time - state_file.stat().st_mtime > max_age:
-                    state_file.unlink()
-            except Exception:
-                pass
+        try:
+            pane_state.remove_expired_states(max_age)
+        except OSError:
+            pass
     
     def handle_pane_exit(self, pane_id):
         """Handle when a pane exits"""
         self.remove_tracked_pane(pane_id)
         
-        # Clean up state file
+        # Clean up saved state
         try:
-            state_file = self.script_dir / f".pane_state_{pane_id.replace('%', '')}.json"
-            if state_file.exists():
-                state_file.unlink()
-        except Exception:
+            pane_state.remove_states([pane_id])
+        except OSError:
             pass
     
     def get_tracked_panes_status(self):
@@ -173,6 +267,19 @@ def signal_handler(signum, frame):
     """Handle shutdown signals"""
     sys.exit(0)
 
+async def run_monitor(tracker):
+    """Run the tracker's monitoring task until SIGTERM or SIGINT"""
+    import asyncio
+    loop = asyncio.get_event_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, tracker.stop_monitoring)
+    
+    tracker.start_monitoring()
+    try:
+        await tracker.monitor_task
+    except asyncio.CancelledError:
+        pass
+
 def main():
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
@@ -187,22 +294,19 @@ def main():
     if command == 'monitor':
         if len(sys.argv) >= 3:
             pane_id = sys.argv[2]
-            tracker.monitor_pane_activity(pane_id)
+            # A running monitor handles the event; otherwise handle it here
+            if not tracker.send_event('select', pane_id):
+                tracker.monitor_pane_activity(pane_id)
         else:
-            # Start general monitoring
-            tracker.start_monitoring()
-            
-            # Keep running until interrupted
-            try:
-                while True:
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                tracker.stop_monitoring()
+            # Start general monitoring and keep running until interrupted
+            import asyncio
+            asyncio.run(run_monitor(tracker))
     
     elif command == 'cleanup':
         if len(sys.argv) >= 3:
             pane_id = sys.argv[2]
-            tracker.handle_pane_exit(pane_id)
+            if not tracker.send_event('exit', pane_id):
+                tracker.handle_pane_exit(pane_id)
         else:
             tracker.cleanup_dead_panes()
     
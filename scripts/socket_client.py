@@ -0,0 +1,103 @@
+# Client side of the plugin's resident daemons, shared by the thin clients
+# (claude_tmux_hooks.py, notify_client.py) and by the daemons themselves.
+# Clients import this on every call, so it must stay standard-library only.
+
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_DIR = os.environ.get('XDG_RUNTIME_DIR') or f'/tmp/tmux-claude-{os.getuid()}'
+HOOK_SOCKET_PATH = os.path.join(RUNTIME_DIR, 'tmux-claude.sock')
+NOTIFY_SOCKET_PATH = os.path.join(RUNTIME_DIR, 'tmux-claude-notify.sock')
+# Environment the handlers depend on, passed along with each request
+FORWARDED_ENV = ('TMUX', 'TMUX_PANE')
+
+def is_private_dir(path):
+    """Whether path is a real directory owned by this user that no one else can access"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+def peer_uid(sock):
+    """Return the user ID of the process at the other end of a Unix socket"""
+    if hasattr(socket, 'SO_PEERCRED'):
+        # Linux: struct ucred {pid_t pid; uid_t uid; gid_t gid;}
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        return struct.unpack('3i', creds)[1]
+    # macOS and BSD: struct xucred {u_int cr_version; uid_t cr_uid; ...} at level SOL_LOCAL (0)
+    creds = sock.getsockopt(0, getattr(socket, 'LOCAL_PEERCRED', 1), struct.calcsize('2I'))
+    return struct.unpack('2I', creds)[1]
+
+def connect(socket_path, timeout):
+    """
+    Connect to a daemon socket.
+
+    Raises PermissionError unless the socket's directory and the listening
+    process both belong to this user, so that no other user can pose as a
+    daemon and answer hooks (e.g. in a shared /tmp without XDG_RUNTIME_DIR).
+    """
+    socket_dir = os.path.dirname(socket_path)
+    if not is_private_dir(socket_dir):
+        raise PermissionError(f"{socket_dir} is not private to this user")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        if peer_uid(sock) != os.getuid():
+            raise PermissionError(f"{socket_path} is served by another user")
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+def forward(request, socket_path, timeout):
+    """
+    Send a request to a daemon and return its reply.
+
+    Returns None when no daemon took the request, so the caller can handle
+    it in-process. Once a daemon has it, a slow or broken reply comes back
+    as {} instead: running the request again could repeat its effects
+    (e.g. send a notification twice).
+    """
+    try:
+        sock = connect(socket_path, timeout)
+    except OSError:
+        # A missing socket, a stale one left by a dead daemon, or a daemon that is not ours
+        return None
+
+    with sock:
+        try:
+            sock.sendall((json.dumps(request) + '\n').encode())
+            with sock.makefile('rb') as reply_file:
+                line = reply_file.readline()
+        except socket.timeout:
+            return {}
+        except OSError:
+            return None
+
+    # A daemon that exits while connections are queued closes them unanswered
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {}
+
+def spawn_daemon(script, *args):
+    """Start a daemon script from this directory in a detached child process"""
+    if os.fork() == 0:
+        try:
+            os.setsid()
+            # Release the caller's stdio pipes so it is not held open by the daemon
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            os.execv(sys.executable, [sys.executable, os.path.join(SCRIPT_DIR, script)] + list(args))
+        finally:
+            os._exit(1)
@@ -0,0 +1,136 @@
+# Shared server side of the plugin's resident daemons (claude_tmux_hookd.py,
+# `notification_handler.py daemon` and tmux_daemon.py): single-instance
+# start-up on a Unix socket, an idle exit, and running forwarded requests.
+
+import io
+import json
+import os
+import sys
+import time
+import fcntl
+import signal
+import contextlib
+import socketserver
+from socket_client import FORWARDED_ENV, is_private_dir, peer_uid
+
+# Exit after this long without a request so a stale daemon never outlives a plugin update
+IDLE_TIMEOUT = 600
+
+@contextlib.contextmanager
+def request_environment(env):
+    """Temporarily apply the caller's tmux environment to this process"""
+    saved = {key: os.environ.get(key) for key in FORWARDED_ENV}
+    for key in FORWARDED_ENV:
+        if key in env:
+            os.environ[key] = env[key]
+        else:
+            os.environ.pop(key, None)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def run_request(request, command, logger):
+    """Run command(argv, payload) for one forwarded request and return (exit_code, stdout)"""
+    stdout = io.StringIO()
+    exit_code = 0
+    with request_environment(request.get('env', {})), contextlib.redirect_stdout(stdout):
+        try:
+            command(request.get('argv', []), request.get('payload'))
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code)
+                exit_code = 1
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            exit_code = 1
+    return exit_code, stdout.getvalue()
+
+def send_reply(wfile, reply, logger):
+    """Write a JSON reply line, logging rather than failing if the client has gone"""
+    try:
+        wfile.write((json.dumps(reply) + '\n').encode())
+    except OSError as e:
+        logger.warning(f"Client went away before the reply: {e}")
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server that serves until stop() is called or no connection
+    has arrived for IDLE_TIMEOUT seconds.
+    """
+    # handle_request() returns at least this often so the loop notices stop()
+    timeout = 1.0
+
+    def __init__(self, socket_path, handler_class):
+        self.stopped = False
+        self.last_request = time.monotonic()
+        super().__init__(str(socket_path), handler_class)
+        os.chmod(socket_path, 0o600)
+
+    def verify_request(self, request, client_address):
+        self.last_request = time.monotonic()
+        # Only serve processes of the user running the daemon
+        try:
+            return peer_uid(request) == os.getuid()
+        except OSError:
+            return False
+
+    def stop(self):
+        """Stop serving after the current request; safe to call from any thread"""
+        self.stopped = True
+
+    def serve_until_idle(self):
+        while not self.stopped and time.monotonic() - self.last_request < IDLE_TIMEOUT:
+            self.handle_request()
+
+def serve(socket_path, make_server, logger, name):
+    """
+    Serve on socket_path with the server returned by make_server(socket_path).
+
+    Returns straight away when another instance already owns the socket, or
+    when the socket's directory is not private to this user.
+    """
+    socket_dir = os.path.dirname(socket_path)
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    # exist_ok also accepts a directory someone else created in a shared /tmp
+    if not is_private_dir(socket_dir):
+        logger.error(f"Not starting {name}: {socket_dir} is not private to this user")
+        return
+
+    # Held for the daemon's lifetime so only one instance owns the socket
+    lock_file = open(f"{socket_path}.lock", 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        logger.info(f"{name} already running")
+        lock_file.close()
+        return
+
+    # Any socket left behind at this point belongs to a daemon that died
+    try:
+        os.unlink(socket_path)
+    except FileNotFoundError:
+        pass
+
+    # Exit through the finally below on SIGTERM so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = make_server(socket_path)
+    logger.info(f"{name} listening on {socket_path}")
+    try:
+        server.serve_until_idle()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+        logger.info(f"{name} stopped")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import shlex
+import threading
+import subprocess
+import socketserver
+from pathlib import Path
+from debug_logger import DebugLogger
+from socket_client import RUNTIME_DIR, connect
+import socket_daemon
+
+CONTROL_SESSION = 'hooks-ctl'
+REPLY_TIMEOUT = 2.0
+# Minimum seconds between attempts to spawn the same daemon
+SPAWN_INTERVAL = 10.0
+
+logger = DebugLogger('tmux_daemon')
+
+def socket_path_for(tmux_env):
+    """
+    Daemon socket for the tmux server named in a $TMUX value.
+
+    Each tmux server gets its own daemon, since a control client can only
+    reach the server it is attached to.
+    """
+    server_socket = tmux_env.split(',')[0]
+    return os.path.join(RUNTIME_DIR, f"tmux-claude-ctl-{zlib.crc32(server_socket.encode()):08x}.sock")
+
+def split_commands(args):
+    """Split a ';'-chained tmux argument list into its commands"""
+    commands = [[]]
+    for arg in args:
+        if arg == ';':
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return [command for command in commands if command]
+
+def format_command(args):
+    """Quote tmux arguments for the control-mode command parser"""
+    return ' '.join(shlex.quote(arg) for arg in args)
+
+class TmuxControlClient:
+    """Long-lived tmux control-mode (-C) client that runs commands without forking tmux"""
+
+    def __init__(self, session=CONTROL_SESSION):
+        cmd = ['tmux']
+        env = dict(os.environ)
+        # $TMUX points at the server we were started from; pass the socket explicitly
+        # and drop the variable so tmux does not refuse to attach a nested client
+        tmux_env = env.pop('TMUX', '')
+        if tmux_env:
+            cmd += ['-S', tmux_env.split(',')[0]]
+        cmd += ['-C', 'new-session', '-A', '-s', session]
+
+        self.session = session
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, env=env, text=True, bufsize=1)
+        self.lock = threading.Lock()
+        self.replies = queue.Queue()
+        # Replies still owed for commands whose reply timed out
+        self.stale_replies = 0
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+        logger.info(f"Started tmux control client: {' '.join(cmd)}")
+
+    def _read_loop(self):
+        """Collect %begin/%end framed replies and drop asynchronous notifications"""
+        block = None
+        guard = None
+        for line in self.proc.stdout:
+            line = line.rstrip('\n')
+            if block is None:
+                # Only blocks flagged 1 answer commands we sent; anything else
+                # (%output, %window-renamed, the initial new-session) is ignored
+                if line.startswith('%begin ') and line.endswith(' 1'):
+                    block = []
+                    guard = line[len('%begin '):]
+                elif line == '%sessions-changed':
+                    # run() waits on this thread for replies, so check from another one
+                    threading.Thread(target=self._exit_if_alone, daemon=True).start()
+                continue
+            if line == f'%end {guard}' or line == f'%error {guard}':
+                self.replies.put((line.startswith('%end'), '\n'.join(block)))
+                block = None
+            else:
+                block.append(line)
+
+        self.closed = True
+        self.replies.put(None)
+        logger.warning("tmux control client exited")
+
+    def _next_reply(self):
+        """Wait for the next command reply as (success, output)"""
+        reply = self.replies.get(timeout=REPLY_TIMEOUT)
+        if reply is None:
+            raise EOFError("tmux control client exited")
+        return reply
+
+    def run(self, args):
+        """
+        Run a tmux command (optionally ';'-chained) and return (success, output).
+
+        Chained commands are sent one line at a time and stop at the first
+        failure, as tmux does, so every line sent gets exactly one reply.
+        Raises queue.Empty when tmux does not reply in time.
+        """
+        success = True
+        output = []
+        with self.lock:
+            if self.closed:
+                raise EOFError("tmux control client is closed")
+
+            # Skip replies that arrived after their command had timed out
+            while self.stale_replies:
+                self._next_reply()
+                self.stale_replies -= 1
+
+            for command in split_commands(args):
+                self.proc.stdin.write(format_command(command) + '\n')
+                self.proc.stdin.flush()
+                try:
+                    success, text = self._next_reply()
+                except queue.Empty:
+                    self.stale_replies += 1
+                    raise
+                if text:
+                    output.append(text)
+                if not success:
+                    break
+        output = '\n'.join(output)
+        if logger.debug_enabled:
+            logger.log_tmux_command(['tmux'] + args, output)
+        return success, output
+
+    def _exit_if_alone(self):
+        """
+        Kill the control session once it is the last session left.
+
+        Otherwise it would keep the tmux server running after the user's own
+        sessions are gone. The control client exits along with the session.
+        """
+        try:
+            success, output = self.run(['list-sessions', '-F', '#{session_name}'])
+            if success and output.split('\n') == [self.session]:
+                logger.info("Only the control session is left, exiting")
+                self.run(['kill-session', '-t', self.session])
+        except (EOFError, queue.Empty, OSError):
+            pass
+
+    def close(self):
+        """Kill the control session and detach the control client"""
+        try:
+            self.run(['kill-session', '-t', self.session])
+        except (EOFError, queue.Empty, OSError):
+            pass
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=REPLY_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Run one JSON-encoded tmux argument list per line and reply with a JSON status line"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                args = json.loads(line)
+                success, output = self.server.control.run(args)
+                reply = {'status': 'ok' if success else 'error', 'output': output}
+            except queue.Empty:
+                # The client stays usable: run() skips the late reply next time
+                logger.warning(f"tmux did not reply to {args}")
+                reply = {'status': 'unavailable', 'output': "tmux reply timed out"}
+            except EOFError as e:
+                logger.error(f"tmux control client unavailable: {e}")
+                reply = {'status': 'unavailable', 'output': str(e)}
+                self.server.stop()
+            except (ValueError, TypeError) as e:
+                reply = {'status': 'error', 'output': f"Bad request: {e}"}
+            self.wfile.write((json.dumps(reply) + '\n').encode())
+            logger.flush()
+
+class TmuxDaemon(socketserver.ThreadingMixIn, socket_daemon.DaemonServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        self.control = TmuxControlClient()
+        super().__init__(socket_path, CommandHandler)
+        threading.Thread(target=self._stop_on_exit, daemon=True).start()
+
+    def _stop_on_exit(self):
+        """Stop serving once the control client exits"""
+        self.control.reader.join()
+        self.stop()
+
+    def server_close(self):
+        super().server_close()
+        # Leave no control session behind in the user's tmux server
+        self.control.close()
+
+# Socket path -> time this process last spawned its daemon
+_spawned_at = {}
+
+def spawn_daemon(socket_path):
+    """
+    Start the daemon for socket_path in the background, detached from the calling process.
+
+    Long-lived callers may outlive several daemons, so a daemon is spawned
+    again once SPAWN_INTERVAL has passed since the last attempt.
+    """
+    now = time.monotonic()
+    if now - _spawned_at.get(socket_path, -SPAWN_INTERVAL) < SPAWN_INTERVAL:
+        return
+    _spawned_at[socket_path] = now
+    logger.info("Spawning tmux control daemon")
+    try:
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve())],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError as e:
+        logger.error(f"Failed to spawn tmux control daemon: {e}")
+
+def send_command(args, socket_path=None):
+    """
+    Run a tmux command through the daemon for the tmux server in $TMUX.
+
+    Returns (success, output), or None when the daemon is unavailable so the
+    caller can fall back to running tmux directly. The daemon is spawned in
+    the background when its socket is missing.
+    """
+    if socket_path is None:
+        # Looked up per call: the hook daemon serves panes of several tmux servers
+        socket_path = socket_path_for(os.environ.get('TMUX', ''))
+    if not os.path.exists(socket_path):
+        spawn_daemon(socket_path)
+        return None
+
+    try:
+        with connect(socket_path, REPLY_TIMEOUT) as sock:
+            sock.sendall((json.dumps(args) + '\n').encode())
+            with sock.makefile('rb') as reply_file:
+                reply = json.loads(reply_file.readline())
+    except ConnectionRefusedError:
+        # Stale socket left by a daemon that died; a fresh daemon will replace it
+        spawn_daemon(socket_path)
+        return None
+    except (OSError, ValueError) as e:
+        logger.debug(f"tmux control daemon request failed: {e}")
+        return None
+
+    if reply.get('status') == 'unavailable':
+        return None
+    return reply.get('status') == 'ok', reply.get('output', '')
+
+def serve(socket_path=None):
+    """Run the daemon for the tmux server in $TMUX until it goes idle or the control client exits"""
+    if socket_path is None:
+        socket_path = socket_path_for(os.environ.get('TMUX', ''))
+    socket_daemon.serve(socket_path, TmuxDaemon, logger, "tmux control daemon")
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] != 'serve':
+        print("Usage: tmux_daemon.py [serve]")
+        sys.exit(1)
+    serve()
+
+if __name__ == '__main__':
+    main()
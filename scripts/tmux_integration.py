@@ -1,25 +1,95 @@
 #!/usr/bin/env python3
 
+# asyncio is imported where it is used: it is slow to import, and the
+# hook and notification paths never need it
 import subprocess
 import json
 import time
-from pathlib import Path
 from typing import Dict, Optional, List
 from debug_logger import DebugLogger
+import tmux_daemon
+import pane_state
+
+logger = DebugLogger('tmux_integration')
+
+# Separator for multi-field tmux format queries; unlike ':' it never appears in titles
+FIELD_SEP = '\x1f'
+PANE_FORMAT = FIELD_SEP.join([
+    '#{session_name}', '#{window_index}.#{pane_index}', '#{pane_id}', '#{pane_title}', '#{pane_pid}'
+])
+PANE_SESSION_FORMAT = FIELD_SEP.join(['#{session_name}', '#{pane_title}', '#{pane_pid}'])
+
+def parse_pane(line: str) -> Optional[Dict]:
+    """Parse one line of PANE_FORMAT output"""
+    fields = line.split(FIELD_SEP, 4)
+    if len(fields) != 5:
+        return None
+    session_name, window_pane, pane_id, title, pid = fields
+    return {
+        'session': session_name,
+        'session_window_pane': f"{session_name}:{window_pane}",
+        'pane_id': pane_id,
+        'title': title,
+        'pid': pid
+    }
+
+async def run_process(*cmd: str):
+    """Run a command without blocking the event loop and return (returncode, stdout)"""
+    import asyncio
+    proc = await asyncio.create_subprocess_exec(*cmd, stdin=asyncio.subprocess.DEVNULL,
+                                                stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.DEVNULL)
+    stdout, _ = await proc.communicate()
+    return proc.returncode, stdout.decode(errors='replace')
 
 class TmuxIntegration:
-    def __init__(self):
-        self.script_dir = Path(__file__).parent
-        self.logger = DebugLogger('tmux_integration')
+    def __init__(self, cache_ttl: float = 0.1):
+        self.logger = logger
+        # Query results are reused for cache_ttl seconds so one event forks tmux once per query
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[tuple, tuple] = {}
+    
+    def invalidate(self):
+        """Drop cached query results after changing tmux state"""
+        self._cache.clear()
+    
+    def _execute(self, args: List[str], client_context: bool = False) -> str:
+        """
+        Run a tmux command and return its raw output.
+        
+        Commands go through the control-mode daemon's persistent connection when
+        it is running, so no tmux process is forked. Commands that resolve the
+        current pane or session from the calling client (client_context=True)
+        always run tmux directly, since the daemon's client is attached to its
+        own session. Raises subprocess.CalledProcessError when the command fails.
+        """
+        if not client_context:
+            reply = tmux_daemon.send_command(args)
+            if reply is not None:
+                success, output = reply
+                if not success:
+                    raise subprocess.CalledProcessError(1, ['tmux'] + args, output=output)
+                return output
+        
+        result = subprocess.run(['tmux'] + args, capture_output=True, text=True, check=True)
+        return result.stdout
     
-    def run_tmux_command(self, args: List[str]) -> Optional[str]:
+    def run_tmux_command(self, args: List[str], client_context: bool = False) -> Optional[str]:
         """Run a tmux command and return output"""
-        self.logger.log_function_call('run_tmux_command', args=[args])
+        key = tuple(args)
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.cache_ttl:
+            return cached[1]
+        
+        # Skip building log arguments entirely when debug logging is off
+        if self.logger.debug_enabled:
+            self.logger.log_function_call('run_tmux_command', args=[args])
         try:
-            cmd = ['tmux'] + args
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            output = result.stdout.strip()
-            self.logger.log_tmux_command(cmd, output)
+            output = self._execute(args, client_context).strip()
+            if self.logger.debug_enabled:
+                self.logger.log_tmux_command(['tmux'] + args, output)
+            self._cache[key] = (now, output)
             return output
         except subprocess.CalledProcessError as e:
             self.logger.log_tmux_command(['tmux'] + args, error=str(e))
@@ -27,35 +97,28 @@ class TmuxIntegration:
             return None
     
     def get_all_panes(self) -> List[Dict]:
-        """Get information about all tmux panes"""
-        panes = []
-        output = self.run_tmux_command(['list-panes', '-a', '-F', 
-                                       '#{session_name}:#{window_index}.#{pane_index}:#{pane_id}:#{pane_title}:#{pane_pid}'])
-        if output:
-            for line in output.split('\n'):
-                if line.strip():
-                    parts = line.split(':')
-                    if len(parts) >= 5:
-                        panes.append({
-                            'session_window_pane': parts[0],
-                            'pane_id': parts[1],
-                            'title': ':'.join(parts[2:-1]),  # Handle colons in title
-                            'pid': parts[-1]
-                        })
-        return panes
+        """Get information about all tmux panes, except the control daemon's session"""
+        output = self.run_tmux_command(['list-panes', '-a', '-F', PANE_FORMAT])
+        if not output:
+            return []
+        panes = map(parse_pane, output.split('\n'))
+        return [pane for pane in panes if pane and pane['session'] != tmux_daemon.CONTROL_SESSION]
     
     def get_pane_info(self, pane_id: str) -> Optional[Dict]:
         """Get detailed information about a specific pane"""
-        output = self.run_tmux_command(['display-message', '-p', '-t', pane_id,
-                                       '#{session_name}:#{window_index}.#{pane_index}:#{pane_id}:#{pane_title}:#{pane_pid}'])
+        output = self.run_tmux_command(['display-message', '-p', '-t', pane_id, PANE_FORMAT])
+        return parse_pane(output) if output else None
+    
+    def get_pane_and_session(self, pane_id: str) -> Optional[Dict]:
+        """Get a pane's session name, title and PID with a single tmux call"""
+        output = self.run_tmux_command(['display-message', '-p', '-t', pane_id, PANE_SESSION_FORMAT])
         if output:
-            parts = output.split(':')
-            if len(parts) >= 5:
+            parts = output.split(FIELD_SEP)
+            if len(parts) == 3:
                 return {
-                    'session_window_pane': parts[0],
-                    'pane_id': parts[1],
-                    'title': ':'.join(parts[2:-1]),
-                    'pid': parts[-1]
+                    'session': parts[0],
+                    'title': parts[1],
+                    'pid': parts[2]
                 }
         return None
     
@@ -65,50 +128,84 @@ class TmuxIntegration:
     
     def set_pane_title(self, pane_id: str, title: str) -> bool:
         """Set the window name of a specific pane"""
+        self.invalidate()
         try:
-            subprocess.run(['tmux', 'rename-window', '-t', pane_id, title], 
-                          check=True, capture_output=True)
+            self._execute(['rename-window', '-t', pane_id, title])
             return True
         except subprocess.CalledProcessError:
             return False
     
     def get_current_pane(self) -> Optional[str]:
         """Get the current pane ID"""
-        return self.run_tmux_command(['display-message', '-p', '#{pane_id}'])
+        return self.run_tmux_command(['display-message', '-p', '#{pane_id}'], client_context=True)
     
     def get_current_session(self) -> Optional[str]:
         """Get the current session name"""
-        return self.run_tmux_command(['display-message', '-p', '#{session_name}'])
+        return self.run_tmux_command(['display-message', '-p', '#{session_name}'], client_context=True)
     
     def is_pane_active(self, pane_id: str) -> bool:
         """Check if a pane is currently active"""
         current_pane = self.get_current_pane()
         return current_pane == pane_id
     
-    def find_claude_panes(self) -> List[Dict]:
+    async def _pane_runs_claude(self, pane: Dict) -> bool:
+        """Check whether a pane's process tree contains claude"""
+        try:
+            # Get process tree for this pane
+            returncode, output = await run_process('pstree', '-p', pane['pid'])
+        except FileNotFoundError:
+            # pstree not available, fall back to ps
+            try:
+                returncode, output = await run_process('ps', '-p', pane['pid'], '-o', 'comm=')
+            except Exception:
+                return False
+        return returncode == 0 and 'claude' in output.lower()
+    
+    async def _process_children(self) -> Optional[Dict[str, List]]:
+        """Snapshot the process table as ppid -> [(pid, command)], or None if ps fails"""
+        try:
+            returncode, output = await run_process('ps', '-eo', 'pid=,ppid=,comm=')
+        except FileNotFoundError:
+            return None
+        if returncode != 0:
+            return None
+        
+        children = {}
+        for line in output.splitlines():
+            fields = line.split(None, 2)
+            if len(fields) == 3:
+                pid, ppid, comm = fields
+                children.setdefault(ppid, []).append((pid, comm))
+        return children
+    
+    def _tree_runs_claude(self, root_pid: str, commands: Dict[str, str], children: Dict[str, List]) -> bool:
+        """Walk a process tree from the snapshot looking for claude"""
+        queue = [root_pid]
+        seen = set()
+        while queue:
+            pid = queue.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            if 'claude' in commands.get(pid, '').lower():
+                return True
+            queue.extend(child for child, _ in children.get(pid, ()))
+        return False
+    
+    async def find_claude_panes(self) -> List[Dict]:
         """Find panes that might be running Claude"""
-        claude_panes = []
         panes = self.get_all_panes()
         
-        for pane in panes:
-            # Check if the pane process tree contains claude
-            try:
-                # Get process tree for this pane
-                result = subprocess.run(['pstree', '-p', pane['pid']], 
-                                      capture_output=True, text=True, check=False)
-                if result.returncode == 0 and 'claude' in result.stdout.lower():
-                    claude_panes.append(pane)
-            except FileNotFoundError:
-                # pstree not available, fall back to ps
-                try:
-                    result = subprocess.run(['ps', '-p', pane['pid'], '-o', 'comm='], 
-                                          capture_output=True, text=True, check=False)
-                    if result.returncode == 0 and 'claude' in result.stdout.lower():
-                        claude_panes.append(pane)
-                except Exception:
-                    pass
+        # One ps snapshot covers every pane's process tree
+        children = await self._process_children()
+        if children is not None:
+            commands = {pid: comm for procs in children.values() for pid, comm in procs}
+            return [pane for pane in panes if self._tree_runs_claude(pane['pid'], commands, children)]
         
-        return claude_panes
+        # Fall back to checking each pane's tree separately, all at once
+        import asyncio
+        results = await asyncio.gather(*(self._pane_runs_claude(pane) for pane in panes))
+        return [pane for pane, is_claude in zip(panes, results) if is_claude]
     
     def monitor_pane_activity(self, pane_id: str, callback_script: str):
         """Set up monitoring for pane activity"""
@@ -117,33 +214,26 @@ class TmuxIntegration:
         
         # Monitor when this pane is selected
         try:
-            subprocess.run(['tmux', 'set-hook', '-t', pane_id, 'after-select-pane', hook_command], 
-                          check=True, capture_output=True)
+            self._execute(['set-hook', '-t', pane_id, 'after-select-pane', hook_command])
         except subprocess.CalledProcessError:
             pass
     
     def remove_pane_monitoring(self, pane_id: str):
         """Remove monitoring for a specific pane"""
         try:
-            subprocess.run(['tmux', 'set-hook', '-t', pane_id, '-u', 'after-select-pane'], 
-                          check=True, capture_output=True)
+            self._execute(['set-hook', '-t', pane_id, '-u', 'after-select-pane'])
         except subprocess.CalledProcessError:
             pass
     
     def cleanup_dead_panes(self):
-        """Clean up state files for panes that no longer exist"""
+        """Clean up saved states for panes that no longer exist"""
         current_panes = {pane['pane_id'] for pane in self.get_all_panes()}
         
-        # Find and remove state files for dead panes
-        for state_file in self.script_dir.glob('.pane_state_*.json'):
-            try:
-                pane_id = state_file.stem.replace('.pane_state_', '')
-                pane_id = f"%{pane_id}"
-                
-                if pane_id not in current_panes:
-                    state_file.unlink()
-            except Exception:
-                pass
+        # Remove saved states for dead panes
+        try:
+            pane_state.remove_states_except(current_panes)
+        except OSError:
+            pass
 
 def main():
     import sys
@@ -161,7 +251,8 @@ def main():
             print(f"{pane['pane_id']}: {pane['title']} (PID: {pane['pid']})")
     
     elif command == 'find-claude':
-        claude_panes = tmux.find_claude_panes()
+        import asyncio
+        claude_panes = asyncio.run(tmux.find_claude_panes())
         for pane in claude_panes:
             print(f"{pane['pane_id']}: {pane['title']} (PID: {pane['pid']})")
     